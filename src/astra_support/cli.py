@@ -12,6 +12,13 @@ from .console import Ansi, configure_console_output, paint
 from .self_update import maybe_prompt_for_update
 
 
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog="astra-support", description="Astra support CLI")
     parser.add_argument("--version", action="version", version=f"astra-support {__version__}")
@@ -53,6 +60,9 @@ def build_parser() -> argparse.ArgumentParser:
     p_test.add_argument("--no-builds", "-B", action="store_true")
     p_test.add_argument("--no-tests", "-T", action="store_true")
     p_test.add_argument("--clean", "-c", action="store_true")
+    p_test.add_argument(
+        "--jobs", "-j", type=_positive_int, help="Max parallel workers, at least 1 (default: sized from CPU count)"
+    )
     p_test.set_defaults(func=test_cmd.run)
 
     p_sim = sub.add_parser("sim", help="Simulation utilities")
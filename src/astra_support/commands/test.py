@@ -18,6 +18,7 @@ def run(args) -> int:
         no_tests=args.no_tests or "--no-tests" in default_flags or "-T" in default_flags,
         clean=args.clean or "--clean" in default_flags or "-c" in default_flags,
         envs=args.env,
+        jobs=args.jobs,
         default_args=config.test_args,
     )
     return run_tests(options)
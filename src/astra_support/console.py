@@ -26,5 +26,18 @@ def configure_console_output() -> None:
                 pass
 
 
+_color_enabled: bool | None = None
+
+
+def color_enabled() -> bool:
+    global _color_enabled
+    if _color_enabled is None:
+        isatty = getattr(sys.stdout, "isatty", None)
+        _color_enabled = bool(isatty and isatty())
+    return _color_enabled
+
+
 def paint(text: str, color: str) -> str:
+    if not color_enabled():
+        return text
     return f"{color}{text}{Ansi.RESET}"
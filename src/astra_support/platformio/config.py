@@ -3,6 +3,7 @@ from __future__ import annotations
 import sys
 from configparser import ConfigParser
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 
@@ -21,7 +22,12 @@ class PlatformioEnv:
 def load_platformio_envs(path: Path) -> list[PlatformioEnv]:
     if not path.exists():
         return []
+    stat = path.stat()
+    return list(_load_platformio_envs_cached(str(path), stat.st_mtime_ns, stat.st_size))
 
+
+@lru_cache(maxsize=8)
+def _load_platformio_envs_cached(path: str, mtime_ns: int, size: int) -> tuple[PlatformioEnv, ...]:
     parser = ConfigParser(interpolation=None)
     parser.optionxform = str
     parser.read(path, encoding="utf-8")
@@ -33,7 +39,7 @@ def load_platformio_envs(path: Path) -> list[PlatformioEnv]:
         name = section.split(":", 1)[1].strip()
         values = {key.strip(): value.strip() for key, value in parser.items(section)}
         envs.append(PlatformioEnv(name=name, section=section, values=values))
-    return envs
+    return tuple(envs)
 
 
 def env_names(path: Path) -> list[str]:
@@ -56,14 +62,24 @@ def filter_envs(all_envs: list[str], requested: list[str] | None) -> list[str]:
 
 
 def select_build_envs(envs: list[str]) -> list[str]:
+    return list(_select_build_envs_cached(tuple(envs)))
+
+
+@lru_cache(maxsize=8)
+def _select_build_envs_cached(envs: tuple[str, ...]) -> tuple[str, ...]:
     if "native" in envs and "unix" in envs:
         if sys.platform == "win32":
-            return [env for env in envs if env != "unix"]
-        return [env for env in envs if env != "native"]
-    return list(envs)
+            return tuple(env for env in envs if env != "unix")
+        return tuple(env for env in envs if env != "native")
+    return envs
 
 
 def select_test_env(envs: list[str]) -> str | None:
+    return _select_test_env_cached(tuple(envs))
+
+
+@lru_cache(maxsize=8)
+def _select_test_env_cached(envs: tuple[str, ...]) -> str | None:
     if "native" in envs:
         return "native"
     if "unix" in envs:
@@ -1,33 +1,78 @@
 from __future__ import annotations
 
+import re
+from collections import deque
+from typing import Iterable
+
 STATUS_PASS = "PASS"
 STATUS_TEST_FAIL = "TEST_FAIL"
 STATUS_COMPILE_ERR = "COMPILE_ERR"
 STATUS_SYSTEM_ERR = "SYSTEM_ERR"
 
 
+# Only the tail of a huge log is ever read; the full text stays on disk.
+_MAX_LOG_LINES = 200
+
+_CLASSIFIER_RE = re.compile(
+    r"(?P<assert_fail>:FAIL:|\[FAILED\])"
+    r"|(?P<syntax_error>: error:|undefined reference|fatal error:)"
+    r"|(?P<pio_error>Error:|ERROR:)"
+    r"|(?P<system_lock>Permission denied|cannot open output file|Device or resource busy)"
+)
+
+# A line with several markers is classified by category priority, not by
+# which marker appears first: a unity :FAIL: outranks an Error: on the same
+# line, matching the order the per-line checks used to run in.
+_CATEGORY_RANK = {"assert_fail": 0, "system_lock": 1, "pio_error": 2, "syntax_error": 3}
+
+
+def _best_category(line: str) -> str | None:
+    best: str | None = None
+    for match in _CLASSIFIER_RE.finditer(line):
+        category = match.lastgroup
+        if (
+            category == "assert_fail"
+            and match.group() == "[FAILED]"
+            and ".cpp:" not in line
+            and ".c:" not in line
+        ):
+            continue
+        if best is None or _CATEGORY_RANK[category] < _CATEGORY_RANK[best]:
+            best = category
+    return best
+
+
 def analyze_output(log_text: str, return_code: int) -> tuple[str, str]:
-    lines = log_text.splitlines()
-    cleaned_lines: list[str] = []
+    cleaned_lines: deque[str] = deque(maxlen=_MAX_LOG_LINES)
     found_assert_fail = False
     found_syntax_error = False
     found_system_lock = False
     found_pio_error = False
 
-    for line in lines:
-        line_strip = line.strip()
-        is_unity_fail = ":FAIL:" in line or ("[FAILED]" in line and (".cpp:" in line or ".c:" in line))
-        if is_unity_fail:
-            cleaned_lines.append(line_strip)
+    # One finditer pass over the whole log; lines without a match are never
+    # touched at the Python level. A matching line is re-scanned on its own
+    # (matches are rare) so _best_category can rank every marker it carries.
+    classified_end = -1
+    for match in _CLASSIFIER_RE.finditer(log_text):
+        if match.start() < classified_end:
+            continue
+        line_start = log_text.rfind("\n", 0, match.start()) + 1
+        line_end = log_text.find("\n", match.end())
+        if line_end == -1:
+            line_end = len(log_text)
+        classified_end = line_end
+        line = log_text[line_start:line_end]
+        category = _best_category(line)
+        if category is None:
+            continue
+        cleaned_lines.append(line.strip())
+        if category == "assert_fail":
             found_assert_fail = True
-        elif ": error:" in line or "undefined reference" in line or "fatal error:" in line:
-            cleaned_lines.append(line_strip)
+        elif category == "syntax_error":
             found_syntax_error = True
-        elif "Error:" in line or "ERROR:" in line:
-            cleaned_lines.append(line_strip)
+        elif category == "pio_error":
             found_pio_error = True
-        elif "Permission denied" in line or "cannot open output file" in line or "Device or resource busy" in line:
-            cleaned_lines.append(line_strip)
+        else:
             found_system_lock = True
 
     if return_code == 0:
@@ -41,40 +86,160 @@ def analyze_output(log_text: str, return_code: int) -> tuple[str, str]:
     if found_syntax_error:
         return STATUS_COMPILE_ERR, "\n".join(cleaned_lines)
     if not cleaned_lines:
-        cleaned_lines = ["No error output captured."]
+        return STATUS_SYSTEM_ERR, "No error output captured."
     return STATUS_SYSTEM_ERR, "\n".join(cleaned_lines)
 
 
+_COLLECTED_RE = re.compile(r"^\s*Collected (\d+) tests", re.MULTILINE)
+# pio pads the summary trailer with "=" on both sides, so the total is not
+# the first thing on the line; accept any run of padding before it.
+_COUNTS_RE = re.compile(
+    r"^[=\s]*(?P<total>\d+) test cases:(?P<detail>[^\n]*(?:failed|succeeded)[^\n]*)",
+    re.MULTILINE,
+)
+_COUNT_DETAIL_RE = re.compile(r"(\d+) (failed|succeeded)")
+
+
+_CASE_RESULT_RE = re.compile(r":(?:(?P<ok>PASS)[ \t]*$|(?P<fail>FAIL):)", re.MULTILINE)
+
+
+def count_case_results(log_text: str) -> tuple[int | None, int | None, int | None]:
+    """Count the Unity per-case PASS/FAIL markers in a log slice.
+
+    A grouped pio test invocation prints the "N test cases:" trailer once for
+    the whole run, so per-folder sections have to be counted from the case
+    result lines instead of the trailer.
+    """
+    passed = failed = 0
+    for match in _CASE_RESULT_RE.finditer(log_text):
+        if match.lastgroup == "ok":
+            passed += 1
+        else:
+            failed += 1
+    if not passed and not failed:
+        return None, None, None
+    return passed + failed, passed, failed
+
+
+_SECTION_RE = re.compile(r"^Processing (\S+) in .*$", re.MULTILINE)
+
+
+def split_test_sections(log_text: str, names: Iterable[str] | None = None) -> dict[str, str]:
+    """Split a multi-folder pio test log into per-folder sections.
+
+    Sections are delimited by the "Processing <name> in <env>" banner pio
+    prints before each test folder; names not in `names` are dropped.
+    """
+    matches = list(_SECTION_RE.finditer(log_text))
+    wanted = set(names) if names is not None else None
+    sections: dict[str, str] = {}
+    for index, match in enumerate(matches):
+        name = match.group(1)
+        if wanted is not None and name not in wanted:
+            continue
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(log_text)
+        sections[name] = log_text[match.start():end]
+    return sections
+
+
+class LogAnalyzer:
+    """Incremental equivalent of analyze_output + parse_test_counts.
+
+    Fed one line at a time while a subprocess is still writing, it keeps only
+    the interesting lines and the test-count totals instead of the whole log.
+    """
+
+    def __init__(self) -> None:
+        self._cleaned_lines: deque[str] = deque(maxlen=_MAX_LOG_LINES)
+        self._found_assert_fail = False
+        self._found_syntax_error = False
+        self._found_pio_error = False
+        self._found_system_lock = False
+        self._counts: tuple[int, int, int] | None = None
+        self._collected: int | None = None
+
+    def feed(self, line: str) -> None:
+        line = line.rstrip("\n")
+        category = _best_category(line)
+        if category is not None:
+            self._cleaned_lines.append(line.strip())
+            if category == "assert_fail":
+                self._found_assert_fail = True
+            elif category == "syntax_error":
+                self._found_syntax_error = True
+            elif category == "pio_error":
+                self._found_pio_error = True
+            else:
+                self._found_system_lock = True
+        if self._counts is None:
+            match = _COUNTS_RE.match(line)
+            if match:
+                passed = 0
+                failed = 0
+                for count, kind in _COUNT_DETAIL_RE.findall(match.group("detail")):
+                    if kind == "failed":
+                        failed = int(count)
+                    else:
+                        passed = int(count)
+                self._counts = (int(match.group("total")), passed, failed)
+            elif self._collected is None:
+                collected = _COLLECTED_RE.match(line)
+                if collected:
+                    self._collected = int(collected.group(1))
+
+    def status(self, return_code: int) -> tuple[str, str]:
+        cleaned_lines = self._cleaned_lines
+        if return_code == 0:
+            if self._found_assert_fail:
+                return STATUS_TEST_FAIL, "\n".join(cleaned_lines)
+            return STATUS_PASS, ""
+        if self._found_assert_fail:
+            return STATUS_TEST_FAIL, "\n".join(cleaned_lines)
+        if self._found_system_lock or self._found_pio_error:
+            return STATUS_SYSTEM_ERR, "\n".join(cleaned_lines)
+        if self._found_syntax_error:
+            return STATUS_COMPILE_ERR, "\n".join(cleaned_lines)
+        if not cleaned_lines:
+            return STATUS_SYSTEM_ERR, "No error output captured."
+        return STATUS_SYSTEM_ERR, "\n".join(cleaned_lines)
+
+    @property
+    def counts(self) -> tuple[int | None, int | None, int | None]:
+        if self._counts is not None:
+            return self._counts
+        return self._collected, None, None
+
+
+# The summary trailer sits at the end of pio's output; search a line-aligned
+# tail slice before falling back to scanning the whole log.
+_TAIL_BYTES = 4096
+
+
 def parse_test_counts(log_text: str) -> tuple[int | None, int | None, int | None]:
-    total = None
-    passed = None
-    failed = None
-    collected = None
-    for line in log_text.splitlines():
-        line_strip = line.strip()
-        if line_strip.startswith("Collected ") and " tests" in line_strip:
-            parts = line_strip.split()
-            if len(parts) >= 2 and parts[1].isdigit():
-                collected = int(parts[1])
-        if " test cases:" in line_strip and ("failed" in line_strip or "succeeded" in line_strip):
-            left, right = line_strip.split(" test cases:", 1)
-            digits = "".join(ch for ch in left if ch.isdigit())
-            total = int(digits) if digits else None
-            passed = 0
-            failed = 0
-            for part in right.split(","):
-                item = part.strip()
-                if "failed" in item:
-                    try:
-                        failed = int(item.split()[0])
-                    except ValueError:
-                        pass
-                if "succeeded" in item:
-                    try:
-                        passed = int(item.split()[0])
-                    except ValueError:
-                        pass
-            break
-    if total is None:
-        total = collected
-    return total, passed, failed
+    if len(log_text) > _TAIL_BYTES:
+        start = log_text.find("\n", len(log_text) - _TAIL_BYTES) + 1
+        if start > 0:
+            counts = _counts_from(log_text, start)
+            if counts is not None:
+                return counts
+    counts = _counts_from(log_text, 0)
+    if counts is not None:
+        return counts
+    collected = _COLLECTED_RE.search(log_text)
+    if collected:
+        return int(collected.group(1)), None, None
+    return None, None, None
+
+
+def _counts_from(log_text: str, start: int) -> tuple[int, int, int] | None:
+    match = _COUNTS_RE.search(log_text, start)
+    if not match:
+        return None
+    passed = 0
+    failed = 0
+    for count, kind in _COUNT_DETAIL_RE.findall(match.group("detail")):
+        if kind == "failed":
+            failed = int(count)
+        else:
+            passed = int(count)
+    return int(match.group("total")), passed, failed
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import time
+from pathlib import Path
+
+
+_TREE_DIRS = ("src", "include", "lib")
+
+
+def run_cache_dir(parallel_build_base: Path) -> Path:
+    return parallel_build_base / ".cache"
+
+
+def clear_run_cache(parallel_build_base: Path) -> None:
+    """Remove the cache directory, retrying briefly: on Windows an antivirus
+    scanner or indexer holding a handle can make the first rmtree fail."""
+    target = run_cache_dir(parallel_build_base)
+    for attempt in range(3):
+        try:
+            shutil.rmtree(target)
+            return
+        except FileNotFoundError:
+            return
+        except OSError:
+            time.sleep(0.1 * (attempt + 1))
+    shutil.rmtree(target, ignore_errors=True)
+
+
+def compute_run_key(project_root: Path, cmd: list[str], extra_dirs: tuple[str, ...] = ()) -> str:
+    """Hash everything that determines a command's output: the command itself,
+    platformio.ini, and the stat signature of the source trees it reads."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in cmd:
+        digest.update(part.encode("utf-8", errors="replace"))
+        digest.update(b"\0")
+    config_path = project_root / "platformio.ini"
+    try:
+        digest.update(config_path.read_bytes())
+    except OSError:
+        pass
+    for rel_dir in (*_TREE_DIRS, *extra_dirs):
+        _update_tree(digest, project_root / rel_dir, project_root)
+    return digest.hexdigest()
+
+
+def _update_tree(digest, root: Path, base: Path) -> None:
+    try:
+        entries = sorted(root.iterdir(), key=lambda entry: entry.name)
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        digest.update(str(entry.relative_to(base)).encode("utf-8", errors="replace"))
+        if entry.is_dir():
+            _update_tree(digest, entry, base)
+        else:
+            digest.update(f":{stat.st_size}:{stat.st_mtime_ns};".encode("ascii"))
+
+
+_DURATIONS_NAME = "test_durations.json"
+
+
+def load_test_durations(parallel_build_base: Path) -> dict[str, float]:
+    path = run_cache_dir(parallel_build_base) / _DURATIONS_NAME
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return {str(name): float(value) for name, value in data.items()}
+    except (OSError, ValueError, TypeError, AttributeError):
+        # Truncated or hand-edited state is as likely as a missing file;
+        # valid JSON of the wrong shape must not crash the run.
+        return {}
+
+
+def store_test_durations(parallel_build_base: Path, durations: dict[str, float]) -> None:
+    """Merge this run's folder durations into the history, smoothing with a
+    rolling average so one noisy run does not reorder the whole schedule."""
+    merged = load_test_durations(parallel_build_base)
+    for name, duration in durations.items():
+        previous = merged.get(name)
+        merged[name] = duration if previous is None else 0.7 * previous + 0.3 * duration
+    cache_dir = run_cache_dir(parallel_build_base)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        (cache_dir / _DURATIONS_NAME).write_text(json.dumps(merged), encoding="utf-8")
+    except OSError:
+        pass
+
+
+def load_cached_run(parallel_build_base: Path, key: str) -> tuple[int, str, float] | None:
+    path = run_cache_dir(parallel_build_base) / f"{key}.json"
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return int(data["returncode"]), str(data["stdout"]), float(data["duration"])
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+
+def store_cached_run(parallel_build_base: Path, key: str, returncode: int, stdout: str, duration: float) -> None:
+    cache_dir = run_cache_dir(parallel_build_base)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps({"returncode": returncode, "stdout": stdout, "duration": duration})
+        (cache_dir / f"{key}.json").write_text(payload, encoding="utf-8")
+    except OSError:
+        pass
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import heapq
+import queue
+import threading
 import time
-from collections import deque
-from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Callable, Iterable, TypeVar
 
 
@@ -10,6 +12,15 @@ ItemT = TypeVar("ItemT")
 ResultT = TypeVar("ResultT")
 
 
+def _retry_delay(attempt: int) -> float:
+    return min(0.2 * attempt, 1.0)
+
+
+# Returned by call() for items skipped after an abort; never surfaces in the
+# result list.
+_ABORTED = object()
+
+
 def run_parallel_with_retries(
     items: Iterable[ItemT],
     worker: Callable[[ItemT], ResultT],
@@ -19,29 +30,99 @@ def run_parallel_with_retries(
     should_retry: Callable[[ResultT], bool],
     on_retry: Callable[[ItemT, int], None] | None = None,
     on_result: Callable[[ItemT, ResultT], None] | None = None,
+    executor: ThreadPoolExecutor | None = None,
+    abort_predicate: Callable[[ResultT], bool | int] | None = None,
+    abort_limit: int = 0,
+    on_abort: Callable[[int], None] | None = None,
 ) -> list[ResultT]:
-    pending = deque(items)
     results: list[ResultT] = []
-    retries: dict[ItemT, int] = {item: 0 for item in pending}
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        in_flight: dict = {}
-        while pending or in_flight:
-            while pending and len(in_flight) < max_workers:
-                item = pending.popleft()
-                in_flight[executor.submit(worker, item)] = item
-
-            done_futures, _ = wait(in_flight.keys(), return_when=FIRST_COMPLETED)
-            for future in done_futures:
-                item = in_flight.pop(future)
-                result = future.result()
-                if should_retry(result) and retries[item] < max_retries:
-                    retries[item] += 1
-                    if on_retry:
-                        on_retry(item, retries[item])
-                    time.sleep(min(0.2 * retries[item], 1.0))
-                    pending.append(item)
-                    continue
-                results.append(result)
-                if on_result:
-                    on_result(item, result)
+    abort_streak = 0
+    aborted = threading.Event()
+    completed: queue.SimpleQueue[Future] = queue.SimpleQueue()
+    # When a shared executor is passed in, its pool may be wider than this
+    # stage's budget; the semaphore keeps at most max_workers items running.
+    limiter = threading.BoundedSemaphore(max_workers)
+
+    def call(item: ItemT) -> ResultT:
+        # On a shared pool every submitted item is already RUNNING (blocked
+        # on the semaphore), so Future.cancel() cannot stop it; the abort
+        # flag lets those threads fall through without invoking the worker.
+        if aborted.is_set():
+            return _ABORTED
+        with limiter:
+            if aborted.is_set():
+                return _ABORTED
+            return worker(item)
+
+    own_executor = executor is None
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        in_flight: dict[Future, tuple[ItemT, int]] = {}
+        # Retries wait out their backoff on this heap instead of blocking the
+        # dispatcher; the sequence number breaks ties for unorderable items.
+        delayed: list[tuple[float, int, ItemT, int]] = []
+        delay_seq = 0
+
+        def submit(item: ItemT, attempt: int = 0) -> None:
+            future = executor.submit(call, item)
+            in_flight[future] = (item, attempt)
+            future.add_done_callback(completed.put)
+
+        for item in items:
+            submit(item)
+
+        while in_flight or delayed:
+            now = time.monotonic()
+            while delayed and delayed[0][0] <= now:
+                _, _, item, attempt = heapq.heappop(delayed)
+                submit(item, attempt)
+            if not in_flight:
+                if delayed:
+                    time.sleep(max(0.0, delayed[0][0] - time.monotonic()))
+                continue
+            timeout = max(0.0, delayed[0][0] - now) if delayed else None
+            try:
+                future = completed.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            item, attempt = in_flight.pop(future)
+            result = future.result()
+            if should_retry(result) and attempt < max_retries:
+                attempt += 1
+                if on_retry:
+                    on_retry(item, attempt)
+                delay_seq += 1
+                heapq.heappush(delayed, (time.monotonic() + _retry_delay(attempt), delay_seq, item, attempt))
+                continue
+            results.append(result)
+            if on_result:
+                on_result(item, result)
+            if abort_predicate is not None and abort_limit > 0:
+                # The predicate may return a count instead of a bool so that
+                # one result standing for several items (a grouped worker)
+                # extends the streak by all of them; zero or False resets it.
+                tally = abort_predicate(result)
+                abort_streak = abort_streak + int(tally) if tally else 0
+                if abort_streak >= abort_limit:
+                    # The host itself looks broken; stop feeding it work.
+                    if on_abort:
+                        on_abort(abort_streak)
+                    aborted.set()
+                    for future in list(in_flight):
+                        if future.cancel():
+                            del in_flight[future]
+                    delayed.clear()
+                    while in_flight:
+                        future = completed.get()
+                        entry = in_flight.pop(future, None)
+                        if entry is None or future.cancelled():
+                            continue
+                        drained = future.result()
+                        if drained is not _ABORTED:
+                            results.append(drained)
+                    break
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True)
     return results
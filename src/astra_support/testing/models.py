@@ -3,7 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class RunResult:
     name: str
     status: str
@@ -12,7 +12,12 @@ class RunResult:
     duration: float
 
 
-@dataclass
+@dataclass(slots=True)
+class InstallResult(RunResult):
+    """Marker subclass so mixed-stage pools can sort install results out."""
+
+
+@dataclass(slots=True)
 class TestRunResult(RunResult):
     test_count: int | None = None
     passed_count: int | None = None
@@ -1,13 +1,36 @@
 from __future__ import annotations
 
+import itertools
+import queue
 import sys
 import threading
 import time
+from functools import lru_cache
 
 from ..console import Ansi, paint
 from .analyze import STATUS_COMPILE_ERR, STATUS_PASS, STATUS_SYSTEM_ERR, STATUS_TEST_FAIL
 
 
+_STATUS_STYLES = {
+    STATUS_PASS: ("✔", Ansi.GREEN),
+    STATUS_TEST_FAIL: ("✘", Ansi.RED),
+    STATUS_COMPILE_ERR: ("✘", Ansi.YELLOW),
+    STATUS_SYSTEM_ERR: ("✘", Ansi.MAGENTA),
+}
+_DEFAULT_STYLE = ("✘", Ansi.MAGENTA)
+
+
+@lru_cache(maxsize=256)
+def _bar_body(filled: int, width: int) -> str:
+    return "=" * filled + "-" * (width - filled)
+
+
+@lru_cache(maxsize=None)
+def _painted_status(status: str) -> tuple[str, str]:
+    icon, color = _STATUS_STYLES.get(status, _DEFAULT_STYLE)
+    return paint(icon, color), paint(status.lower(), color)
+
+
 def supports_live_progress() -> bool:
     if not sys.stdout.isatty():
         return False
@@ -21,66 +44,103 @@ class ProgressReporter:
         self.enabled = enabled and supports_live_progress()
         self._lock = threading.Lock()
         self._stop = threading.Event()
+        self._dirty = threading.Event()
+        self._messages: queue.SimpleQueue[str] = queue.SimpleQueue()
         self._thread: threading.Thread | None = None
         self._visible = False
         self._last_line = ""
         self._stage_name = ""
         self._done = 0
+        self._advanced = itertools.count(1)
         self._total = 0
         self._stage_start = 0.0
+        self._last_signature: tuple | None = None
+        if not self.enabled:
+            # Specialize the disabled reporter once instead of branching on
+            # self.enabled inside every call: messages go straight to print
+            # and the bar machinery becomes a no-op.
+            self.write = print
+            self.start = self.advance = self.stop = self._noop
+
+    @staticmethod
+    def _noop(*_args, **_kwargs) -> None:
+        return None
 
     def start(self, stage_name: str, total: int) -> None:
         self._stage_name = stage_name
         self._done = 0
+        self._advanced = itertools.count(1)
         self._total = max(1, total)
-        self._stage_start = time.time()
-        if not self.enabled:
-            return
+        self._stage_start = time.monotonic()
         self._stop.clear()
+        self._dirty.clear()
         self._render()
         self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
         self._thread.start()
 
     def advance(self) -> None:
-        with self._lock:
-            self._done = min(self._total, self._done + 1)
-            if self.enabled:
-                self._render_locked()
+        # Lock-free on the worker side: itertools.count hands out increments
+        # atomically and the render thread only ever reads _done, so workers
+        # never contend with rendering. A stale store briefly shows an older
+        # count; the next advance or tick corrects it.
+        self._done = min(self._total, next(self._advanced))
+        self._dirty.set()
 
     def write(self, message: str) -> None:
-        if not self.enabled:
-            print(message)
-            return
-        with self._lock:
-            self._clear_locked()
-            print(message)
-            self._render_locked()
+        self._messages.put(message)
+        self._dirty.set()
 
     def stop(self) -> None:
-        if not self.enabled:
-            return
         self._stop.set()
+        self._dirty.set()
         if self._thread is not None:
             self._thread.join(timeout=1.0)
         with self._lock:
+            self._drain_messages_locked()
             self._clear_locked()
         self._thread = None
 
     def _refresh_loop(self) -> None:
-        while not self._stop.wait(0.25):
+        min_interval = 0.05
+        last_render = 0.0
+        while not self._stop.is_set():
+            self._dirty.wait(timeout=1.0)
+            if self._stop.is_set():
+                break
+            remaining = min_interval - (time.monotonic() - last_render)
+            if remaining > 0:
+                time.sleep(remaining)
+            self._dirty.clear()
             with self._lock:
+                self._drain_messages_locked()
                 self._render_locked()
+            last_render = time.monotonic()
 
     def _render(self) -> None:
         with self._lock:
             self._render_locked()
 
+    def _drain_messages_locked(self) -> None:
+        drained: list[str] = []
+        while True:
+            try:
+                drained.append(self._messages.get_nowait())
+            except queue.Empty:
+                break
+        if drained:
+            self._clear_locked()
+            print("\n".join(drained))
+
     def _render_locked(self) -> None:
-        elapsed = int(time.time() - self._stage_start)
+        elapsed = int(time.monotonic() - self._stage_start)
+        signature = (self._stage_name, self._done, self._total, elapsed)
+        if self._visible and signature == self._last_signature:
+            return
+        self._last_signature = signature
         minutes, seconds = divmod(elapsed, 60)
         width = 24
         filled = int((self._done / max(1, self._total)) * width)
-        bar = "=" * filled + "-" * (width - filled)
+        bar = _bar_body(filled, width)
         line = (
             f"{Ansi.DIM}{self._stage_name:<8}{Ansi.RESET} "
             f"[{bar}] {self._done}/{self._total} "
@@ -109,28 +169,68 @@ def print_retry(item: str, attempt: int) -> None:
     print(f"{paint('retry', Ansi.YELLOW)} {attempt}: {item}")
 
 
-def print_result(name: str, status: str, duration: float, *, extra: str = "", log: str = "") -> None:
-    icon, color = _status_style(status)
-    line = f"{paint(icon, color)} {name}: {paint(status.lower(), color)} {paint(f'({duration:.1f}s)', Ansi.DIM)}"
+def format_result(name: str, status: str, duration: float, *, extra: str = "", log: str = "") -> str:
+    icon, label = _painted_status(status)
+    line = f"{icon} {name}: {label} {paint(f'({duration:.1f}s)', Ansi.DIM)}"
     if extra:
         line = f"{line} {extra}"
-    print(line)
     if log:
-        print(paint(log, Ansi.DIM))
+        line = f"{line}\n{paint(log, Ansi.DIM)}"
+    return line
 
 
-def print_summary(clean_results, install_results, build_results, test_results) -> None:
-    print(f"\n{paint('[summary]', Ansi.BOLD)}")
-    _print_group("clean", clean_results)
-    _print_group("platforms", install_results)
-    _print_group("builds", build_results)
-    _print_group("tests", list(test_results))
+def print_result(name: str, status: str, duration: float, *, extra: str = "", log: str = "") -> None:
+    print(format_result(name, status, duration, extra=extra, log=log))
 
 
-def _print_group(name: str, results) -> None:
+def print_results(results, *, extra_fn=None) -> None:
     if not results:
-        print(f"{name}: {paint('skipped', Ansi.DIM)}")
         return
+    print(
+        "\n".join(
+            format_result(
+                result.name,
+                result.status,
+                result.duration,
+                extra=extra_fn(result) if extra_fn else "",
+                log=result.log,
+            )
+            for result in results
+        )
+    )
+
+
+def print_summary(clean_results, install_results, build_results, test_results) -> None:
+    test_results = list(test_results)
+    lines = [
+        f"\n{paint('[summary]', Ansi.BOLD)}",
+        _format_group("clean", clean_results),
+        _format_group("platforms", install_results),
+        _format_group("builds", build_results),
+        _format_group("tests", test_results),
+    ]
+    total_cases = passed_cases = failed_cases = 0
+    have_counts = False
+    for result in test_results:
+        if result.test_count is None:
+            continue
+        have_counts = True
+        total_cases += result.test_count
+        passed_cases += result.passed_count or 0
+        failed_cases += result.failed_count or 0
+    if have_counts:
+        lines.append(
+            f"cases: "
+            f"{paint(f'total={total_cases}', Ansi.BOLD)} "
+            f"{paint(f'pass={passed_cases}', Ansi.GREEN)} "
+            f"{paint(f'fail={failed_cases}', Ansi.RED)}"
+        )
+    print("\n".join(lines))
+
+
+def _format_group(name: str, results) -> str:
+    if not results:
+        return f"{name}: {paint('skipped', Ansi.DIM)}"
     counts = {
         STATUS_PASS: 0,
         STATUS_TEST_FAIL: 0,
@@ -139,7 +239,7 @@ def _print_group(name: str, results) -> None:
     }
     for result in results:
         counts[result.status] = counts.get(result.status, 0) + 1
-    print(
+    return (
         f"{name}: "
         f"{paint(f'pass={counts[STATUS_PASS]}', Ansi.GREEN)} "
         f"{paint(f'fail={counts[STATUS_TEST_FAIL]}', Ansi.RED)} "
@@ -149,10 +249,4 @@ def _print_group(name: str, results) -> None:
 
 
 def _status_style(status: str) -> tuple[str, str]:
-    if status == STATUS_PASS:
-        return "✔", Ansi.GREEN
-    if status == STATUS_TEST_FAIL:
-        return "✘", Ansi.RED
-    if status == STATUS_COMPILE_ERR:
-        return "✘", Ansi.YELLOW
-    return "✘", Ansi.MAGENTA
+    return _STATUS_STYLES.get(status, _DEFAULT_STYLE)
@@ -1,17 +1,48 @@
 from __future__ import annotations
 
+import contextlib
+import json
 import os
+import re
 import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+from ..console import Ansi, paint
 from ..platformio.config import env_platform_map, env_names, filter_envs, select_build_envs, select_test_env
 from ..prereqs import check_toolchain
-from .analyze import STATUS_PASS, STATUS_SYSTEM_ERR, analyze_output, parse_test_counts
-from .executor import run_parallel_with_retries
-from .models import RunResult, TestRunResult
-from .report import ProgressReporter, print_result, print_stage, print_summary
+from .analyze import (
+    STATUS_PASS,
+    STATUS_SYSTEM_ERR,
+    LogAnalyzer,
+    analyze_output,
+    count_case_results,
+    parse_test_counts,
+    split_test_sections,
+)
+from .cache import (
+    clear_run_cache,
+    compute_run_key,
+    load_cached_run,
+    load_test_durations,
+    store_cached_run,
+    store_test_durations,
+)
+from .executor import _retry_delay, run_parallel_with_retries
+from .models import InstallResult, RunResult, TestRunResult
+from .report import ProgressReporter, print_results, print_stage, print_summary
 
 
 MAX_RETRIES = 3
@@ -26,6 +57,7 @@ class TestRunnerOptions:
     no_tests: bool = False
     clean: bool = False
     envs: list[str] | None = None
+    jobs: int | None = None
     default_args: list[str] = field(default_factory=list)
 
 
@@ -39,6 +71,7 @@ class RunnerContext:
     build_envs: list[str]
     platforms: dict[str, str]
     test_env: str | None
+    jobs: int | None = None
 
 
 def run_tests(options: TestRunnerOptions) -> int:
@@ -74,6 +107,7 @@ def run_tests(options: TestRunnerOptions) -> int:
         build_envs=build_envs,
         platforms=platforms,
         test_env=test_env,
+        jobs=options.jobs,
     )
 
     clean_results: list[RunResult] = []
@@ -81,83 +115,450 @@ def run_tests(options: TestRunnerOptions) -> int:
     build_results: list[RunResult] = []
     test_results: list[TestRunResult] = []
     progress = ProgressReporter(enabled=not options.no_progress)
-
-    if options.clean and ctx.envs:
-        print_stage("clean")
-        clean_results = _run_pool(
-            ctx.envs,
-            lambda env: _run_clean_env(ctx, env),
-            progress=progress,
-            stage_name="clean",
-        )
-        for result in clean_results:
-            print_result(result.name, result.status, result.duration, log=result.log)
-
-    if not options.no_install:
-        print_stage("install")
-        platforms_to_install = _platforms_for_envs(ctx.build_envs, ctx.platforms)
-        install_results = _run_pool(
-            platforms_to_install,
-            lambda platform: _run_platform_install(ctx, platform),
-            progress=progress,
-            stage_name="install",
-        )
-        for result in install_results:
-            print_result(result.name, result.status, result.duration, log=result.log)
-
-    if not options.no_builds:
-        print_stage("build")
-        build_results = _run_pool(
-            ctx.build_envs,
-            lambda env: _run_build_env(ctx, env),
-            progress=progress,
-            stage_name="build",
-        )
-        for result in build_results:
-            print_result(result.name, result.status, result.duration, log=result.log)
-
-    if not options.no_tests:
-        print_stage("test")
-        if ctx.test_env is None:
-            print("No compatible test environment found.")
-        elif not ctx.test_dir.exists():
-            print(f"Test directory not found: {ctx.test_dir}")
-        else:
-            folders = sorted(path.name for path in ctx.test_dir.iterdir() if path.is_dir())
-            test_results = _run_pool(
-                folders,
-                lambda folder: _run_test_folder(ctx, folder),
+    # One pool is shared by every stage; run_parallel_with_retries applies
+    # each stage's own concurrency limit, so size it to the widest ceiling.
+    pool_size = max(min(32, max(4, _cpu_budget() * 4)), options.jobs or 0)
+    with ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="pio") as executor:
+        if options.clean:
+            clear_run_cache(ctx.parallel_build_base)
+        if options.clean and ctx.envs:
+            print_stage("clean")
+            clean_results = _run_pool(
+                ctx.envs,
+                lambda env: _run_clean_env(ctx, env),
+                progress=progress,
+                stage_name="clean",
+                io_bound=True,
+                executor=executor,
+                jobs=ctx.jobs,
+            )
+            print_results(clean_results)
+
+        platforms_to_install: list[str] = []
+        if not options.no_install:
+            platforms_to_install = _platforms_for_envs(ctx.build_envs, ctx.platforms)
+            installed = _installed_platforms()
+            if installed:
+                platforms_to_install = [platform for platform in platforms_to_install if platform not in installed]
+
+        pipeline_installs = not options.no_builds and not options.no_tests
+        if not options.no_install and not pipeline_installs:
+            print_stage("install")
+            install_results = _run_pool(
+                platforms_to_install,
+                lambda platform: _run_platform_install(ctx, platform),
                 progress=progress,
-                stage_name="test",
+                stage_name="install",
+                io_bound=True,
+                executor=executor,
+                jobs=ctx.jobs,
             )
-            for result in test_results:
-                extra = f"[{result.test_count} cases]" if result.test_count is not None else ""
-                print_result(result.name, result.status, result.duration, extra=extra, log=result.log)
+            print_results(install_results)
 
+        if not options.no_builds and not options.no_tests:
+            install_results, build_results, test_results = _run_pipeline(
+                ctx, progress, executor, platforms_to_install
+            )
+        elif not options.no_builds:
+            print_stage("build")
+            build_results = _run_pool(
+                ctx.build_envs,
+                lambda env: _run_build_env(ctx, env),
+                progress=progress,
+                stage_name="build",
+                executor=executor,
+                jobs=ctx.jobs,
+            )
+            print_results(build_results)
+        elif not options.no_tests:
+            print_stage("test")
+            if ctx.test_env is None:
+                print("No compatible test environment found.")
+            elif not ctx.test_dir.exists():
+                print(f"Test directory not found: {ctx.test_dir}")
+            else:
+                folders = _discover_test_folders(ctx.test_dir, ctx.parallel_build_base)
+                base_env = _test_base_env()
+                test_results, misses = _partition_cached_tests(ctx, folders)
+                groups = _group_test_folders(misses, _stage_workers(len(misses), io_bound=False, jobs=ctx.jobs))
+                test_abort = threading.Event()
+                test_results += _flatten_test_results(
+                    _run_pool(
+                        groups,
+                        lambda group: _run_test_group(ctx, group, base_env, test_abort),
+                        progress=progress,
+                        stage_name="test",
+                        executor=executor,
+                        jobs=ctx.jobs,
+                        abort_event=test_abort,
+                    )
+                )
+                print_results(test_results, extra_fn=_test_extra)
+
+    if test_results:
+        store_test_durations(
+            ctx.parallel_build_base,
+            {result.name: result.duration for result in test_results},
+        )
     print_summary(clean_results, install_results, build_results, test_results)
-    failures = [result for result in [*clean_results, *install_results, *build_results, *test_results] if result.status != STATUS_PASS]
-    return 1 if failures else 0
+    has_failure = any(
+        result.status != STATUS_PASS
+        for results in (clean_results, install_results, build_results, test_results)
+        for result in results
+    )
+    return 1 if has_failure else 0
+
+
+def _cpu_budget() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _stage_workers(item_count: int, *, io_bound: bool, jobs: int | None = None) -> int:
+    if jobs is not None and jobs > 0:
+        return max(1, min(item_count, jobs))
+    budget = _cpu_budget()
+    ceiling = min(32, max(4, budget * 4)) if io_bound else max(1, budget - 1)
+    return max(1, min(item_count, ceiling))
 
 
-def _run_pool(items, worker, *, progress: ProgressReporter, stage_name: str):
+def _item_label(item) -> str:
+    # Pipeline items are ("kind", payload) tuples and test groups are folder
+    # lists; render both readably for user-visible retry messages.
+    if isinstance(item, tuple):
+        kind, payload = item
+        return f"{kind} {_item_label(payload)}"
+    if isinstance(item, list):
+        return "+".join(item)
+    return str(item)
+
+
+def _system_err_tally(result) -> int:
+    # Grouped test items return lists: a group that is nothing but system
+    # errors extends the abort streak by its folder count, while any folder
+    # that made progress resets it.
+    if isinstance(result, list):
+        if result and all(getattr(item, "status", None) == STATUS_SYSTEM_ERR for item in result):
+            return len(result)
+        return 0
+    return 1 if getattr(result, "status", None) == STATUS_SYSTEM_ERR else 0
+
+
+def _run_pool(items, worker, *, progress: ProgressReporter, stage_name: str, io_bound: bool = False, executor: ThreadPoolExecutor | None = None, jobs: int | None = None, abort_event: threading.Event | None = None):
     if not items:
         return []
     progress.start(stage_name, len(items))
-    max_workers = max(1, min(len(items), (os.cpu_count() or 1) - 1))
+    max_workers = _stage_workers(len(items), io_bound=io_bound, jobs=jobs)
+    # Report the width this stage actually runs at; the shared pool's size
+    # is a ceiling, not what any single stage uses.
+    if len(items) > 1:
+        progress.write(paint(f"{stage_name}: {max_workers} workers", Ansi.DIM))
+
+    def on_abort(streak: int) -> None:
+        # Let in-flight group workers know the stage is aborting so they
+        # stop burning per-folder retries.
+        if abort_event is not None:
+            abort_event.set()
+        progress.write(f"aborting {stage_name}: {streak} consecutive system errors")
+
     try:
         return run_parallel_with_retries(
             items,
             worker,
             max_workers=max_workers,
             max_retries=MAX_RETRIES,
-            should_retry=lambda result: result.status == STATUS_SYSTEM_ERR,
-            on_retry=lambda item, attempt: progress.write(f"retry {attempt}: {item}"),
+            # Multi-folder test groups return lists and retry their own
+            # per-folder fallback; single results are retried at stage level.
+            should_retry=lambda result: getattr(result, "status", None) == STATUS_SYSTEM_ERR,
+            on_retry=lambda item, attempt: progress.write(f"retry {attempt}: {_item_label(item)}"),
             on_result=lambda _item, _result: progress.advance(),
+            executor=executor,
+            # A run of system errors across distinct items means the host
+            # itself is broken (toolchain gone, device detached); bail out
+            # instead of burning retries on every remaining item. The limit
+            # scales with the stage so small stages can still reach it.
+            abort_predicate=_system_err_tally,
+            abort_limit=max(2, min(max_workers * 2, len(items) // 2)),
+            on_abort=on_abort,
         )
     finally:
         progress.stop()
 
 
+def _test_base_env() -> dict[str, str]:
+    # Snapshot the environment once per stage; any inherited
+    # PLATFORMIO_BUILD_DIR would shadow the per-folder override.
+    return {key: value for key, value in os.environ.items() if key != "PLATFORMIO_BUILD_DIR"}
+
+
+def _test_extra(result: TestRunResult) -> str:
+    return f"[{result.test_count} cases]" if result.test_count is not None else ""
+
+
+def _group_test_folders(folders: list[str], max_workers: int) -> list[list[str]]:
+    # One pio test invocation pays seconds of startup regardless of test
+    # size, so batch folders into at most max_workers groups; with few
+    # folders this degrades to one folder per group and the cached path.
+    # Folders arrive longest-first, so stripe them round-robin: contiguous
+    # slices would stack all the slow folders into the same invocation.
+    group_count = min(len(folders), max(1, max_workers))
+    return [folders[index::group_count] for index in range(group_count)]
+
+
+def _partition_cached_tests(ctx: RunnerContext, folders: list[str]) -> tuple[list[TestRunResult], list[str]]:
+    # Grouped invocations never consult the run cache themselves, so replay
+    # hits up front and batch only the misses; otherwise a warm re-run would
+    # re-execute every grouped folder.
+    cached_results: list[TestRunResult] = []
+    misses: list[str] = []
+    for folder in folders:
+        result = _cached_test_result(ctx, folder)
+        if result is None:
+            misses.append(folder)
+        else:
+            cached_results.append(result)
+    return cached_results, misses
+
+
+def _flatten_test_results(raw) -> list[TestRunResult]:
+    flat: list[TestRunResult] = []
+    for entry in raw:
+        if isinstance(entry, list):
+            flat.extend(entry)
+        else:
+            flat.append(entry)
+    return flat
+
+
+def _rerun_test_folder(
+    ctx: RunnerContext,
+    folder_name: str,
+    base_env: dict[str, str],
+    abort_event: threading.Event | None = None,
+) -> TestRunResult:
+    # Reruns happen inside a group worker, past the stage-level retry hook,
+    # so apply the same SYSTEM_ERR retry policy the dispatcher would.
+    result = _run_test_folder(ctx, folder_name, base_env)
+    for attempt in range(1, MAX_RETRIES + 1):
+        if result.status != STATUS_SYSTEM_ERR:
+            break
+        if abort_event is not None and abort_event.is_set():
+            # The stage is aborting; retrying on a broken host is wasted work.
+            break
+        time.sleep(_retry_delay(attempt))
+        result = _run_test_folder(ctx, folder_name, base_env)
+    return result
+
+
+def _run_test_group(
+    ctx: RunnerContext,
+    folders: list[str],
+    base_env: dict[str, str],
+    abort_event: threading.Event | None = None,
+) -> TestRunResult | list[TestRunResult]:
+    # A single-folder group is returned bare so the stage-level retry and
+    # abort machinery can see its status.
+    if len(folders) == 1:
+        return _run_test_folder(ctx, folders[0], base_env)
+    group_name = f"{folders[0]}_x{len(folders)}"
+    env = {**base_env, "PLATFORMIO_BUILD_DIR": str(ctx.parallel_build_base / group_name)}
+    cmd = [*ctx.pio_cmd, "test", "-e", ctx.test_env or ""]
+    for folder in folders:
+        cmd += ["-f", folder]
+    log_path = _log_path(ctx, "test", group_name)
+    code, output, duration = _run_command(ctx, cmd, env=env, log_path=log_path)
+    sections = split_test_sections(output, folders)
+    per_folder_duration = duration / len(folders)
+    results: list[TestRunResult] = []
+    for folder in folders:
+        section = sections.get(folder)
+        if section is not None:
+            status, log = analyze_output(section, code)
+            if code == 0 or status != STATUS_SYSTEM_ERR:
+                # The group's "N test cases:" trailer is printed once after the
+                # last section, so count each folder's cases from its own slice.
+                test_count, passed_count, failed_count = count_case_results(section)
+                results.append(
+                    TestRunResult(
+                        folder,
+                        status,
+                        0 if status == STATUS_PASS else code,
+                        log,
+                        per_folder_duration,
+                        test_count,
+                        passed_count,
+                        failed_count,
+                    )
+                )
+                continue
+        # Missing section, or the group failed without evidence in this
+        # folder's slice: rerun it on its own so the failure (or pass) is
+        # attributed correctly, retrying system errors as the stage would.
+        results.append(_rerun_test_folder(ctx, folder, base_env, abort_event))
+    return results
+
+
+def _run_pipeline(
+    ctx: RunnerContext,
+    progress: ProgressReporter,
+    executor: ThreadPoolExecutor,
+    install_platforms: list[str],
+):
+    """Schedule install, build, and test work in dependency waves.
+
+    A build only depends on its own platform's install and testing only
+    depends on the test environment's build. When that build can start right
+    away it shares the first wave with the pending installs, and every other
+    build plus the test groups follow in the second. Otherwise installs,
+    ready builds, and tests share one wave, builds of still-installing
+    platforms run next, and tests whose environment is among them run last.
+    """
+    install_results: list[RunResult] = []
+    build_results: list[RunResult] = []
+    test_results: list[TestRunResult] = []
+    folders: list[str] = []
+    test_note = ""
+    if ctx.test_env is None:
+        test_note = "No compatible test environment found."
+    elif not ctx.test_dir.exists():
+        test_note = f"Test directory not found: {ctx.test_dir}"
+    else:
+        folders = _discover_test_folders(ctx.test_dir, ctx.parallel_build_base)
+
+    pending = set(install_platforms)
+    blocked_envs = [env for env in ctx.build_envs if ctx.platforms.get(env) in pending] if pending else []
+    ready_envs = [env for env in ctx.build_envs if env not in blocked_envs]
+    stage = "+".join(
+        part
+        for part, wanted in (("install", bool(pending)), ("build", True), ("test", bool(folders)))
+        if wanted
+    )
+    print_stage(stage)
+
+    base_env = _test_base_env()
+    test_abort = threading.Event()
+    groups: list[list[str]] = []
+    if folders:
+        cached_tests, misses = _partition_cached_tests(ctx, folders)
+        test_results.extend(cached_tests)
+        if misses:
+            groups = _group_test_folders(misses, _stage_workers(len(misses), io_bound=False, jobs=ctx.jobs))
+
+    def classify(results) -> None:
+        for result in results:
+            if isinstance(result, list):
+                test_results.extend(result)
+            elif isinstance(result, TestRunResult):
+                test_results.append(result)
+            elif isinstance(result, InstallResult):
+                install_results.append(result)
+            else:
+                build_results.append(result)
+
+    def run_item(item):
+        kind, payload = item
+        if kind == "install":
+            return _run_platform_install(ctx, payload)
+        if kind == "build":
+            return _run_build_env(ctx, payload)
+        return _run_test_group(ctx, payload, base_env, test_abort)
+
+    # The test env's build gates every test folder, so run it as early as
+    # possible, sharing its wave with the installs - neither depends on the
+    # other, so no worker idles while it compiles. If the test env's platform
+    # is itself still pending, tests move to a later wave instead.
+    gating_env = ctx.test_env if (groups and ctx.test_env in ready_envs) else None
+    tests_deferred = bool(groups) and ctx.test_env in blocked_envs
+    wave1 = []
+    if gating_env is not None:
+        classify(
+            _run_pool(
+                [*(("install", platform) for platform in install_platforms), ("build", gating_env)],
+                run_item,
+                progress=progress,
+                stage_name=stage,
+                executor=executor,
+                jobs=ctx.jobs,
+            )
+        )
+        # The installs finished alongside the gating build, so formerly
+        # blocked builds can join the main wave.
+        wave1 += [("build", env) for env in blocked_envs]
+        blocked_envs = []
+    else:
+        wave1 += [("install", platform) for platform in install_platforms]
+    wave1 += [("build", env) for env in ready_envs if env != gating_env]
+    if groups and not tests_deferred:
+        wave1 += [("test", group) for group in groups]
+    classify(
+        _run_pool(wave1, run_item, progress=progress, stage_name=stage, executor=executor, jobs=ctx.jobs, abort_event=test_abort)
+    )
+
+    if blocked_envs:
+        classify(
+            _run_pool(
+                [("build", env) for env in blocked_envs],
+                run_item,
+                progress=progress,
+                stage_name=stage,
+                executor=executor,
+                jobs=ctx.jobs,
+            )
+        )
+    if tests_deferred:
+        classify(
+            _run_pool(
+                [("test", group) for group in groups],
+                run_item,
+                progress=progress,
+                stage_name=stage,
+                executor=executor,
+                jobs=ctx.jobs,
+                abort_event=test_abort,
+            )
+        )
+
+    print_results(install_results)
+    print_results(build_results)
+    if folders:
+        print_results(test_results, extra_fn=_test_extra)
+    elif test_note:
+        print(test_note)
+    return install_results, build_results, test_results
+
+
+def _installed_platforms() -> set[str]:
+    """Read the installed-platform manifests straight off disk; spawning
+    pio platform list costs seconds of interpreter startup per run."""
+    installed: set[str] = set()
+    platforms_dir = _platformio_core_dir() / "platforms"
+    try:
+        entries = list(os.scandir(platforms_dir))
+    except OSError:
+        return installed
+    for entry in entries:
+        manifest = Path(entry.path) / "platform.json"
+        try:
+            name = json.loads(manifest.read_text(encoding="utf-8")).get("name")
+        except (OSError, ValueError):
+            continue
+        if name:
+            installed.add(name)
+    return installed
+
+
+def _discover_test_folders(test_dir: Path, parallel_build_base: Path) -> list[str]:
+    with os.scandir(test_dir) as entries:
+        folders = sorted(entry.name for entry in entries if entry.is_dir(follow_symlinks=False))
+    # Longest-first scheduling: starting the slow folders early keeps workers
+    # from idling at the tail of the stage. Folders with no recorded history
+    # run first; alphabetical order breaks ties reproducibly.
+    durations = load_test_durations(parallel_build_base)
+    folders.sort(key=lambda name: -durations.get(name, float("inf")))
+    return folders
+
+
 def _platforms_for_envs(envs: list[str], mapping: dict[str, str]) -> list[str]:
     ordered: list[str] = []
     for env in envs:
@@ -167,55 +568,199 @@ def _platforms_for_envs(envs: list[str], mapping: dict[str, str]) -> list[str]:
     return ordered
 
 
-def _run_command(ctx: RunnerContext, cmd: list[str], *, env: dict[str, str] | None = None) -> tuple[int, str, float]:
-    start = time.time()
-    result = subprocess.run(
-        cmd,
-        cwd=ctx.project_root,
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-    )
-    return result.returncode, result.stdout, time.time() - start
+def _log_path(ctx: RunnerContext, stage: str, name: str) -> Path:
+    log_dir = ctx.parallel_build_base / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    safe_name = re.sub(r"[^\w.-]", "_", name)
+    return log_dir / f"{stage}-{safe_name}.log"
+
+
+def _run_command(
+    ctx: RunnerContext,
+    cmd: list[str],
+    *,
+    env: dict[str, str] | None = None,
+    log_path: Path | None = None,
+    append: bool = False,
+) -> tuple[int, str, float]:
+    start = time.monotonic()
+    if log_path is None:
+        result = subprocess.run(
+            cmd,
+            cwd=ctx.project_root,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        return result.returncode, result.stdout, time.monotonic() - start
+    with open(log_path, "a+b" if append else "w+b") as handle:
+        marker = handle.tell()
+        code = subprocess.run(
+            cmd,
+            cwd=ctx.project_root,
+            env=env,
+            stdout=handle,
+            stderr=subprocess.STDOUT,
+        ).returncode
+        handle.flush()
+        handle.seek(marker)
+        output = handle.read().decode("utf-8", errors="replace")
+    return code, output, time.monotonic() - start
+
+
+def _read_log(log_path: Path) -> str:
+    try:
+        return log_path.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return ""
+
+
+def _stream_command(
+    ctx: RunnerContext,
+    cmd: list[str],
+    *,
+    env: dict[str, str] | None = None,
+    log_path: Path,
+) -> tuple[int, LogAnalyzer, float]:
+    """Run a command, teeing stdout line-by-line into the log file and an
+    incremental analyzer so large logs are never held in memory whole."""
+    start = time.monotonic()
+    analyzer = LogAnalyzer()
+    with open(log_path, "w", encoding="utf-8", errors="replace") as handle:
+        proc = subprocess.Popen(
+            cmd,
+            cwd=ctx.project_root,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            bufsize=1,
+        )
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            handle.write(line)
+            analyzer.feed(line)
+        code = proc.wait()
+    return code, analyzer, time.monotonic() - start
 
 
 def _run_platform_install(ctx: RunnerContext, platform: str) -> RunResult:
-    code, output, duration = _run_command(ctx, [*ctx.pio_cmd, "platform", "install", platform])
+    log_path = _log_path(ctx, "install", platform)
+    code, output, duration = _run_command(ctx, [*ctx.pio_cmd, "platform", "install", platform], log_path=log_path)
     status, log = analyze_output(output, code)
-    return RunResult(platform, status, code, log, duration)
+    return InstallResult(platform, status, code, log, duration)
+
+
+# pio pkg update/install mutate the shared PlatformIO core directory, so only
+# one may run per core dir at a time even though clean envs run in parallel.
+_pkg_thread_lock = threading.Lock()
+
+
+def _platformio_core_dir() -> Path:
+    configured = os.environ.get("PLATFORMIO_CORE_DIR")
+    if configured:
+        return Path(configured)
+    return Path.home() / ".platformio"
+
+
+@contextlib.contextmanager
+def _pkg_mutation_lock():
+    lock_path = _platformio_core_dir() / ".astra-pkg.lock"
+    with _pkg_thread_lock:
+        try:
+            lock_path.parent.mkdir(parents=True, exist_ok=True)
+            handle = open(lock_path, "w")
+        except OSError:
+            yield
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                elif msvcrt is not None:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            handle.close()
 
 
 def _run_clean_env(ctx: RunnerContext, env_name: str) -> RunResult:
+    log_path = _log_path(ctx, "clean", env_name)
     outputs: list[str] = []
     code = 0
     duration = 0.0
-    for cmd in (
-        [*ctx.pio_cmd, "run", "-e", env_name, "-t", "clean"],
-        [*ctx.pio_cmd, "pkg", "update", "-e", env_name],
-        [*ctx.pio_cmd, "pkg", "install", "-e", env_name],
+    for index, (cmd, mutates_packages) in enumerate(
+        (
+            ([*ctx.pio_cmd, "run", "-e", env_name, "-t", "clean"], False),
+            ([*ctx.pio_cmd, "pkg", "update", "-e", env_name], True),
+            ([*ctx.pio_cmd, "pkg", "install", "-e", env_name], True),
+        )
     ):
-        code, output, step_duration = _run_command(ctx, cmd)
+        if mutates_packages:
+            with _pkg_mutation_lock():
+                code, output, step_duration = _run_command(ctx, cmd, log_path=log_path, append=index > 0)
+        else:
+            code, output, step_duration = _run_command(ctx, cmd, log_path=log_path, append=index > 0)
         outputs.append(output)
         duration += step_duration
         if code != 0:
             break
     joined = "\n".join(part for part in outputs if part)
+    outputs.clear()
     status, log = analyze_output(joined, code)
+    del joined
     return RunResult(env_name, status, code, log, duration)
 
 
 def _run_build_env(ctx: RunnerContext, env_name: str) -> RunResult:
-    code, output, duration = _run_command(ctx, [*ctx.pio_cmd, "run", "-e", env_name])
-    status, log = analyze_output(output, code)
+    cmd = [*ctx.pio_cmd, "run", "-e", env_name]
+    cache_key = compute_run_key(ctx.project_root, cmd)
+    cached = load_cached_run(ctx.parallel_build_base, cache_key)
+    if cached is not None:
+        code, output, duration = cached
+        status, log = analyze_output(output, code)
+        return RunResult(env_name, status, code, log, duration)
+    log_path = _log_path(ctx, "build", env_name)
+    code, analyzer, duration = _stream_command(ctx, cmd, log_path=log_path)
+    status, log = analyzer.status(code)
+    if status == STATUS_PASS:
+        store_cached_run(ctx.parallel_build_base, cache_key, code, _read_log(log_path), duration)
     return RunResult(env_name, status, code, log, duration)
 
 
-def _run_test_folder(ctx: RunnerContext, folder_name: str) -> TestRunResult:
-    unique_build_path = ctx.parallel_build_base / folder_name
-    env = os.environ.copy()
-    env["PLATFORMIO_BUILD_DIR"] = str(unique_build_path)
-    code, output, duration = _run_command(ctx, [*ctx.pio_cmd, "test", "-e", ctx.test_env or "", "-f", folder_name], env=env)
+def _cached_test_result(ctx: RunnerContext, folder_name: str) -> TestRunResult | None:
+    """Replay a folder's cached run, or None on a cache miss."""
+    cmd = [*ctx.pio_cmd, "test", "-e", ctx.test_env or "", "-f", folder_name]
+    cache_key = compute_run_key(ctx.project_root, cmd, extra_dirs=(f"test/{folder_name}",))
+    cached = load_cached_run(ctx.parallel_build_base, cache_key)
+    if cached is None:
+        return None
+    code, output, duration = cached
     status, log = analyze_output(output, code)
     test_count, passed_count, failed_count = parse_test_counts(output)
     return TestRunResult(folder_name, status, code, log, duration, test_count, passed_count, failed_count)
+
+
+def _run_test_folder(ctx: RunnerContext, folder_name: str, base_env: dict[str, str]) -> TestRunResult:
+    cached = _cached_test_result(ctx, folder_name)
+    if cached is not None:
+        return cached
+    cmd = [*ctx.pio_cmd, "test", "-e", ctx.test_env or "", "-f", folder_name]
+    cache_key = compute_run_key(ctx.project_root, cmd, extra_dirs=(f"test/{folder_name}",))
+    unique_build_path = ctx.parallel_build_base / folder_name
+    env = {**base_env, "PLATFORMIO_BUILD_DIR": str(unique_build_path)}
+    log_path = _log_path(ctx, "test", folder_name)
+    code, analyzer, duration = _stream_command(ctx, cmd, env=env, log_path=log_path)
+    status, log = analyzer.status(code)
+    test_count, passed_count, failed_count = analyzer.counts
+    if status == STATUS_PASS:
+        store_cached_run(ctx.parallel_build_base, cache_key, code, _read_log(log_path), duration)
+    return TestRunResult(folder_name, status, code, log, duration, test_count, passed_count, failed_count)
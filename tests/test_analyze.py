@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import unittest
+
+from astra_support.testing.analyze import (
+    STATUS_COMPILE_ERR,
+    STATUS_PASS,
+    STATUS_SYSTEM_ERR,
+    STATUS_TEST_FAIL,
+    LogAnalyzer,
+    analyze_output,
+    count_case_results,
+    parse_test_counts,
+    split_test_sections,
+)
+
+
+class AnalyzeOutputTests(unittest.TestCase):
+    def test_clean_run_passes(self):
+        status, log = analyze_output("Building...\nAll good\n", 0)
+        self.assertEqual(status, STATUS_PASS)
+        self.assertEqual(log, "")
+
+    def test_unity_assert_failure(self):
+        status, log = analyze_output("test/main.cpp:42:test_thing:FAIL: Expected 1 Was 2\n", 1)
+        self.assertEqual(status, STATUS_TEST_FAIL)
+        self.assertIn(":FAIL:", log)
+
+    def test_compile_error(self):
+        status, log = analyze_output("src/main.cpp:10:5: error: 'foo' was not declared\n", 1)
+        self.assertEqual(status, STATUS_COMPILE_ERR)
+        self.assertIn("error:", log)
+
+    def test_unity_fail_outranks_error_on_same_line(self):
+        output = "Error: test/main.cpp:42:test_thing:FAIL: Expected 1 Was 2\n"
+        status, _ = analyze_output(output, 1)
+        self.assertEqual(status, STATUS_TEST_FAIL)
+
+    def test_system_lock_wins_over_compile_error(self):
+        output = "ld: cannot open output file firmware.elf: Permission denied\nfatal error: stop\n"
+        status, _ = analyze_output(output, 1)
+        self.assertEqual(status, STATUS_SYSTEM_ERR)
+
+    def test_nonzero_exit_without_markers_is_system_error(self):
+        status, log = analyze_output("nothing notable\n", 1)
+        self.assertEqual(status, STATUS_SYSTEM_ERR)
+        self.assertEqual(log, "No error output captured.")
+
+
+class ParseTestCountsTests(unittest.TestCase):
+    def test_summary_line(self):
+        log = "some output\n11 test cases: 2 failed, 9 succeeded in 00:00:01\n"
+        self.assertEqual(parse_test_counts(log), (11, 9, 2))
+
+    def test_summary_line_all_passing(self):
+        log = "11 test cases: 11 succeeded in 00:00:01\n"
+        self.assertEqual(parse_test_counts(log), (11, 11, 0))
+
+    def test_padded_summary_line(self):
+        log = (
+            "some output\n"
+            "=============== 11 test cases: 2 failed, 9 succeeded in 00:00:01.024 ===============\n"
+        )
+        self.assertEqual(parse_test_counts(log), (11, 9, 2))
+
+    def test_padded_summary_line_in_long_log_tail(self):
+        log = "filler line\n" * 2000 + (
+            "========= 5 test cases: 5 succeeded in 00:00:00.120 =========\n"
+        )
+        self.assertEqual(parse_test_counts(log), (5, 5, 0))
+
+    def test_collected_fallback(self):
+        log = "Collected 7 tests\ncrash before summary\n"
+        self.assertEqual(parse_test_counts(log), (7, None, None))
+
+    def test_no_counts(self):
+        self.assertEqual(parse_test_counts("nothing\n"), (None, None, None))
+
+
+class LogAnalyzerTests(unittest.TestCase):
+    def _feed(self, log):
+        analyzer = LogAnalyzer()
+        for line in log.splitlines(keepends=True):
+            analyzer.feed(line)
+        return analyzer
+
+    def test_matches_analyze_output(self):
+        log = "Building...\ntest/main.cpp:12: error: expected ';'\n"
+        analyzer = self._feed(log)
+        self.assertEqual(analyzer.status(1), analyze_output(log, 1))
+
+    def test_streamed_fail_outranks_error_on_same_line(self):
+        log = "Error: test/main.cpp:42:test_thing:FAIL: Expected 1 Was 2\n"
+        analyzer = self._feed(log)
+        self.assertEqual(analyzer.status(1), (STATUS_TEST_FAIL, log.strip()))
+
+    def test_streamed_counts_match_parse_test_counts(self):
+        log = "Collected 11 tests\n11 test cases: 2 failed, 9 succeeded in 00:00:01\n"
+        analyzer = self._feed(log)
+        self.assertEqual(analyzer.counts, parse_test_counts(log))
+
+    def test_streamed_padded_summary_line(self):
+        log = "=============== 11 test cases: 2 failed, 9 succeeded in 00:00:01.024 ===============\n"
+        analyzer = self._feed(log)
+        self.assertEqual(analyzer.counts, (11, 9, 2))
+
+    def test_collected_only(self):
+        analyzer = self._feed("Collected 7 tests\ncrash before summary\n")
+        self.assertEqual(analyzer.counts, (7, None, None))
+
+    def test_clean_run(self):
+        analyzer = self._feed("Building...\nAll good\n")
+        self.assertEqual(analyzer.status(0), (STATUS_PASS, ""))
+        self.assertEqual(analyzer.counts, (None, None, None))
+
+
+class CountCaseResultsTests(unittest.TestCase):
+    def test_counts_pass_and_fail_markers(self):
+        section = (
+            "test/test_alpha/main.cpp:10:test_one:PASS\n"
+            "test/test_alpha/main.cpp:20:test_two:FAIL: Expected 1 Was 2\n"
+            "test/test_alpha/main.cpp:30:test_three:PASS\n"
+        )
+        self.assertEqual(count_case_results(section), (3, 2, 1))
+
+    def test_ignores_group_summary_trailer(self):
+        # The last section of a grouped run also contains the whole group's
+        # trailer; only this folder's case markers may be counted.
+        section = (
+            "test/test_beta/main.cpp:10:test_one:PASS\n"
+            "=============== 11 test cases: 2 failed, 9 succeeded in 00:00:01 ===============\n"
+        )
+        self.assertEqual(count_case_results(section), (1, 1, 0))
+
+    def test_no_markers(self):
+        self.assertEqual(count_case_results("Building...\n"), (None, None, None))
+
+
+class SplitTestSectionsTests(unittest.TestCase):
+    LOG = (
+        "Verbosity level...\n"
+        "Processing test_alpha in native environment\n"
+        "alpha output\n"
+        "Processing test_beta in native environment\n"
+        "beta output\n"
+    )
+
+    def test_splits_on_processing_banners(self):
+        sections = split_test_sections(self.LOG, ["test_alpha", "test_beta"])
+        self.assertIn("alpha output", sections["test_alpha"])
+        self.assertNotIn("beta output", sections["test_alpha"])
+        self.assertIn("beta output", sections["test_beta"])
+
+    def test_ignores_unrequested_names(self):
+        sections = split_test_sections(self.LOG, ["test_beta"])
+        self.assertEqual(set(sections), {"test_beta"})
+
+    def test_no_banners(self):
+        self.assertEqual(split_test_sections("plain output\n", ["test_alpha"]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from astra_support.testing.cache import (
+    clear_run_cache,
+    compute_run_key,
+    load_cached_run,
+    load_test_durations,
+    run_cache_dir,
+    store_cached_run,
+    store_test_durations,
+)
+
+
+class RunCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        (self.root / "platformio.ini").write_text("[env:native]\nplatform = native\n")
+        (self.root / "src").mkdir()
+        (self.root / "src" / "main.cpp").write_text("int main() { return 0; }\n")
+        self.base = self.root / ".pio" / "build_parallel"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_key_is_stable_for_unchanged_inputs(self):
+        cmd = ["pio", "run", "-e", "native"]
+        self.assertEqual(compute_run_key(self.root, cmd), compute_run_key(self.root, cmd))
+
+    def test_key_changes_when_source_changes(self):
+        cmd = ["pio", "run", "-e", "native"]
+        before = compute_run_key(self.root, cmd)
+        source = self.root / "src" / "main.cpp"
+        source.write_text("int main() { return 1; }\n")
+        os.utime(source, ns=(1, 1))
+        self.assertNotEqual(before, compute_run_key(self.root, cmd))
+
+    def test_key_changes_with_command(self):
+        self.assertNotEqual(
+            compute_run_key(self.root, ["pio", "run", "-e", "native"]),
+            compute_run_key(self.root, ["pio", "run", "-e", "teensy41"]),
+        )
+
+    def test_store_and_load_round_trip(self):
+        store_cached_run(self.base, "abc123", 0, "All good\n", 1.5)
+        self.assertEqual(load_cached_run(self.base, "abc123"), (0, "All good\n", 1.5))
+
+    def test_load_missing_entry_returns_none(self):
+        self.assertIsNone(load_cached_run(self.base, "missing"))
+
+    def test_clear_removes_entries(self):
+        store_cached_run(self.base, "abc123", 0, "All good\n", 1.5)
+        clear_run_cache(self.base)
+        self.assertIsNone(load_cached_run(self.base, "abc123"))
+
+    def test_load_wrong_shape_returns_none(self):
+        cache_dir = run_cache_dir(self.base)
+        cache_dir.mkdir(parents=True)
+        (cache_dir / "bad.json").write_text("null")
+        self.assertIsNone(load_cached_run(self.base, "bad"))
+
+    def test_durations_wrong_shape_returns_empty(self):
+        cache_dir = run_cache_dir(self.base)
+        cache_dir.mkdir(parents=True)
+        (cache_dir / "test_durations.json").write_text('{"test_alpha": null}')
+        self.assertEqual(load_test_durations(self.base), {})
+
+    def test_durations_round_trip(self):
+        store_test_durations(self.base, {"test_alpha": 2.0})
+        self.assertEqual(load_test_durations(self.base), {"test_alpha": 2.0})
+
+    def test_durations_use_rolling_average(self):
+        store_test_durations(self.base, {"test_alpha": 10.0})
+        store_test_durations(self.base, {"test_alpha": 20.0})
+        self.assertAlmostEqual(load_test_durations(self.base)["test_alpha"], 13.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from astra_support.testing.executor import run_parallel_with_retries
+
+
+class ExecutorTests(unittest.TestCase):
+    def test_returns_one_result_per_item(self):
+        results = run_parallel_with_retries(
+            ["a", "b", "c"],
+            lambda item: item.upper(),
+            max_workers=2,
+            max_retries=0,
+            should_retry=lambda result: False,
+        )
+        self.assertEqual(sorted(results), ["A", "B", "C"])
+
+    def test_retries_until_worker_succeeds(self):
+        attempts: dict[str, int] = {}
+        lock = threading.Lock()
+
+        def worker(item: str) -> str:
+            with lock:
+                attempts[item] = attempts.get(item, 0) + 1
+                return "flaky" if attempts[item] < 3 else "ok"
+
+        results = run_parallel_with_retries(
+            ["a", "b"],
+            worker,
+            max_workers=2,
+            max_retries=3,
+            should_retry=lambda result: result == "flaky",
+        )
+        self.assertEqual(results, ["ok", "ok"])
+        self.assertEqual(attempts, {"a": 3, "b": 3})
+
+    def test_gives_up_after_max_retries(self):
+        retry_log: list[tuple[str, int]] = []
+        results = run_parallel_with_retries(
+            ["a"],
+            lambda item: "flaky",
+            max_workers=1,
+            max_retries=2,
+            should_retry=lambda result: result == "flaky",
+            on_retry=lambda item, attempt: retry_log.append((item, attempt)),
+        )
+        self.assertEqual(results, ["flaky"])
+        self.assertEqual(retry_log, [("a", 1), ("a", 2)])
+
+    def test_on_result_called_for_each_final_result(self):
+        seen: list[str] = []
+        run_parallel_with_retries(
+            ["a", "b"],
+            lambda item: item,
+            max_workers=2,
+            max_retries=0,
+            should_retry=lambda result: False,
+            on_result=lambda item, result: seen.append(item),
+        )
+        self.assertEqual(sorted(seen), ["a", "b"])
+
+    def test_aborts_after_consecutive_matching_results(self):
+        aborts: list[int] = []
+
+        def worker(item):
+            time.sleep(0.05)
+            return "broken"
+
+        results = run_parallel_with_retries(
+            list("abcdefgh"),
+            worker,
+            max_workers=1,
+            max_retries=0,
+            should_retry=lambda result: False,
+            abort_predicate=lambda result: result == "broken",
+            abort_limit=2,
+            on_abort=aborts.append,
+        )
+        self.assertLess(len(results), 8)
+        self.assertEqual(aborts, [2])
+
+    def test_abort_predicate_count_extends_streak(self):
+        # A result standing for several items (a grouped worker returning a
+        # list) may report a count; two groups of two reach a limit of 4.
+        aborts: list[int] = []
+
+        def worker(item):
+            time.sleep(0.05)
+            return ["broken", "broken"]
+
+        results = run_parallel_with_retries(
+            list("abcdef"),
+            worker,
+            max_workers=1,
+            max_retries=0,
+            should_retry=lambda result: False,
+            abort_predicate=len,
+            abort_limit=4,
+            on_abort=aborts.append,
+        )
+        self.assertLess(len(results), 6)
+        self.assertEqual(aborts, [4])
+
+    def test_abort_skips_queued_items_on_shared_executor(self):
+        # On a shared pool every item is already running (blocked on the
+        # semaphore), so cancel() never succeeds; the abort flag must keep
+        # the queued items from invoking the worker.
+        invocations: list[int] = []
+        lock = threading.Lock()
+
+        def worker(item):
+            with lock:
+                invocations.append(item)
+            time.sleep(0.05)
+            return "broken"
+
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            results = run_parallel_with_retries(
+                list(range(12)),
+                worker,
+                max_workers=2,
+                max_retries=0,
+                should_retry=lambda result: False,
+                executor=pool,
+                abort_predicate=lambda result: result == "broken",
+                abort_limit=2,
+            )
+        self.assertLess(len(results), 12)
+        self.assertLess(len(invocations), 12)
+
+    def test_abort_streak_resets_on_good_result(self):
+        aborts: list[int] = []
+        results = run_parallel_with_retries(
+            ["bad", "good", "bad", "good"],
+            lambda item: item,
+            max_workers=1,
+            max_retries=0,
+            should_retry=lambda result: False,
+            abort_predicate=lambda result: result == "bad",
+            abort_limit=2,
+            on_abort=aborts.append,
+        )
+        self.assertEqual(len(results), 4)
+        self.assertEqual(aborts, [])
+
+
+if __name__ == "__main__":
+    unittest.main()